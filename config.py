@@ -36,6 +36,7 @@ SAVED_DIR: Path = set_path_var(config_paths['saved'])
 SEARCH_URL: str = config_program['search_url']
 INFO_COLOR: str = config_program['info_color']
 DEBUG_MODE: bool = config_program.getboolean('debug')
+SINGLE_INSTANCE: bool = config_program.getboolean('single_instance', True)
 
 w, h = config_program['window_size'].split(',')
 win_size: Tuple[int, int] = (int(w), int(h))
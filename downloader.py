@@ -3,11 +3,17 @@ from pathlib import Path
 from typing import Dict
 
 import requests
-from PySide2.QtCore import QObject, Signal, QRunnable
+from PySide2.QtCore import QObject, Signal, QRunnable, QSize, Qt
+from PySide2.QtGui import QImageReader
 
-from helpers import short_path
+from helpers import short_path, url_to_path
 from logger import logger
 
+# Thumbnails of local images are scaled down to fit this size
+# and saved as THUMB_FORMAT, since Qt can't write some formats it reads (gif, svg)
+THUMB_SIZE: QSize = QSize(640, 360)
+THUMB_FORMAT: str = '.png'
+
 
 class Download(QObject):
     """
@@ -22,6 +28,10 @@ class Download(QObject):
     and emit "finished_chunk" signal each time a chunk
     is downloaded. It allows to show progress of
     downloading of a large file in progress bar.
+
+    "file://" urls are copied from disk the same way.
+
+    save() returns True if the file has been saved.
     """
     finished_chunk = Signal(Path)
     finished_file = Signal(Path)
@@ -39,7 +49,10 @@ class Download(QObject):
             if not isinstance(self.payload, dict):
                 logger.error("Use {'key', 'value'} as query")
 
-    def save(self):
+    def save(self) -> bool:
+        if self.url.startswith('file://'):
+            return self.copy()
+
         r = requests.get(self.url, stream=self.stream, params=self.payload)
 
         logger.debug(
@@ -63,8 +76,34 @@ class Download(QObject):
                             file_size = f.write(r.content)
                         self.finished_file.emit(self.file)
                         logger.debug(f'{self.file} {file_size / 1024:.1f}KB has been saved')
+                return True
             except IOError as e:
                 logger.debug(f'Could not open {short_path(self.file)} for writing')
+        return False
+
+    def copy(self) -> bool:
+        source: Path = url_to_path(self.url)
+
+        logger.debug(
+            f'Trying to copy {short_path(self.file)} from {short_path(source)}')
+
+        try:
+            with open(source, 'rb') as src, open(self.file, 'wb') as f:
+                file_size = source.stat().st_size
+                if self.stream:
+                    for chunk in iter(lambda: src.read(max(int(file_size / 23), 1)), b''):
+                        f.write(chunk)
+                        self.finished_chunk.emit(self.file)
+                else:
+                    f.write(src.read())
+        except IOError as e:
+            logger.debug(f'Could not copy {short_path(source)} to {short_path(self.file)}')
+            return False
+
+        # Emit when the file is closed, so receivers get the whole file
+        self.finished_file.emit(self.file)
+        logger.debug(f'{self.file} {file_size / 1024:.1f}KB has been copied')
+        return True
 
 
 class DownloadThread(QRunnable, Download):
@@ -81,3 +120,46 @@ class DownloadThread(QRunnable, Download):
 
     def run(self):
         self.save()
+
+
+class ThumbnailThread(DownloadThread):
+    """
+    DownloadThread for thumbnails of the search with search_id.
+
+    Emit "finished_thumb" signal with search id, file path object
+    and True if the thumbnail has been saved, so that thumbnails
+    of a previous search can be dropped and failed ones
+    still count in progress bar.
+
+    Local images are scaled down to THUMB_SIZE instead of being copied.
+    """
+    finished_thumb = Signal(int, Path, bool)
+
+    def __init__(self, file: Path, dir_: Path, url: str, search_id: int, parent=None):
+        super().__init__(file, dir_, url, parent=parent)
+        self.search_id: int = search_id
+
+    def run(self):
+        try:
+            saved: bool = self.scale() if self.url.startswith('file://') else self.save()
+        except requests.RequestException as e:
+            logger.warning(f'Could not download {self.url}: {e}')
+            saved = False
+        self.finished_thumb.emit(self.search_id, self.file, saved)
+
+    def scale(self) -> bool:
+        reader = QImageReader(str(url_to_path(self.url)))
+        size: QSize = reader.size()
+        if size.width() > THUMB_SIZE.width() or size.height() > THUMB_SIZE.height():
+            reader.setScaledSize(size.scaled(THUMB_SIZE, Qt.KeepAspectRatio))
+
+        image = reader.read()
+        if image.isNull():
+            logger.warning(f'Could not read {self.url}: {reader.errorString()}')
+            return False
+        if not image.save(str(self.file)):
+            logger.warning(f'Could not save thumbnail {short_path(self.file)}')
+            return False
+
+        logger.debug(f'{short_path(self.file)} has been scaled from {size.width()}x{size.height()}')
+        return True
@@ -5,6 +5,8 @@ import os
 import sys
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 
 from PySide2.QtGui import QImageReader
 
@@ -36,6 +38,22 @@ def is_image(file: Path) -> bool:
     return file.suffix[1:] in supported_image_formats()
 
 
+def url_suffix(url: str, default: str = '.jpg') -> str:
+    """
+    Return image extension of url without query string.
+    Return default if url has no supported image extension
+    """
+    suffix: str = os.path.splitext(urlparse(url).path)[1].lower()
+    if suffix[1:] not in supported_image_formats():
+        return default
+    return suffix
+
+
+def url_to_path(url: str) -> Path:
+    """ Convert "file://" url to path object """
+    return Path(url2pathname(urlparse(url).path))
+
+
 def is_dir_contains_images(dir_: Path) -> bool:
     """
     Take dir path object and return True
@@ -79,7 +97,7 @@ def image_info(image_id: str) -> Dict[str, str]:
             if wallpaper['id'] == image_id:
                 info['image_id'] = wallpaper['id']
                 info['full_image_url'] = wallpaper['path']
-                info['extension'] = wallpaper['path'][-4:]
+                info['extension'] = url_suffix(wallpaper['path'])
                 info['page_url'] = wallpaper['url']
                 info['resolution'] = wallpaper['resolution']
 
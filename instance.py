@@ -0,0 +1,115 @@
+import getpass
+from pathlib import Path
+from typing import Tuple
+
+import shiboken2
+from PySide2.QtCore import QCoreApplication, QDir, QLockFile, Signal
+from PySide2.QtNetwork import QLocalServer, QLocalSocket
+
+from logger import logger
+
+# One server per user, so instances of different users don't clash
+SERVER_NAME: str = f'changewall-{getpass.getuser()}'
+COMMANDS: Tuple[str, ...] = ('next', 'apply', 'save', 'refresh', 'show')
+# Held while an instance checks for a running one and starts listening
+LOCK_FILE: str = str(Path(QDir.tempPath()).joinpath(f'{SERVER_NAME}.lock'))
+
+
+def send_command(command: str, timeout: int = 1000) -> bool:
+    """
+    Forward command to running instance.
+    Return True if the command was delivered,
+    False if there is no running instance
+    """
+    # QLocalSocket needs an application instance on some platforms.
+    # It is destroyed afterwards, so that QApplication can be created
+    app = None
+    if QCoreApplication.instance() is None:
+        app = QCoreApplication([])
+
+    try:
+        socket = QLocalSocket()
+        socket.connectToServer(SERVER_NAME)
+        if not socket.waitForConnected(timeout):
+            return False
+
+        socket.write(f'{command}\n'.encode())
+        socket.waitForBytesWritten(timeout)
+        if socket.waitForReadyRead(timeout):
+            reply: str = socket.readLine().data().decode().strip()
+            logger.debug(f'Running instance replied {reply} to {command}')
+        socket.disconnectFromServer()
+        return True
+    finally:
+        if app is not None:
+            shiboken2.delete(socket)
+            shiboken2.delete(app)
+
+
+class InstanceServer(QLocalServer):
+    """
+    QLocalServer which receives commands from other invocations.
+
+    Protocol is one command per line, the server replies
+    with "ok" or "unknown" line and emits "command" signal
+    with the command name.
+    """
+    command = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Only the current user can connect
+        self.setSocketOptions(QLocalServer.UserAccessOption)
+        self.newConnection.connect(self.accept)
+
+    def start(self) -> bool:
+        """ Start listening. Return False if another instance is already listening """
+        # Checking and listening must be atomic, otherwise
+        # instances started at the same time would both listen
+        lock = QLockFile(LOCK_FILE)
+        if not lock.tryLock(5000):
+            logger.error(f'Could not lock {LOCK_FILE}')
+            return False
+
+        try:
+            # listen() with UserAccessOption replaces the socket of a running
+            # instance instead of failing, so check for it first
+            if send_command('show'):
+                logger.warning('Another instance is already running')
+                return False
+
+            # Remove socket file left by an instance which has crashed
+            QLocalServer.removeServer(SERVER_NAME)
+            if not self.listen(SERVER_NAME):
+                logger.error(f'Could not listen on {SERVER_NAME}: {self.errorString()}')
+                return False
+        finally:
+            lock.unlock()
+
+        logger.debug(f'Listening on {self.fullServerName()}')
+        return True
+
+    def accept(self) -> None:
+        """ Read commands of each new connection """
+        while self.hasPendingConnections():
+            connection: QLocalSocket = self.nextPendingConnection()
+            connection.readyRead.connect(lambda c=connection: self.read(c))
+            connection.disconnected.connect(connection.deleteLater)
+            self.read(connection)
+
+    def read(self, connection: QLocalSocket) -> None:
+        """
+        Reply to each received command before emitting it,
+        so the client doesn't wait for modal dialogs
+        """
+        while connection.canReadLine():
+            command: str = connection.readLine().data().decode().strip()
+            if command in COMMANDS:
+                connection.write(b'ok\n')
+                connection.flush()
+                logger.debug(f'Received command {command}')
+                self.command.emit(command)
+            else:
+                connection.write(b'unknown\n')
+                connection.flush()
+                logger.warning(f'Received unknown command {command}')
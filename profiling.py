@@ -0,0 +1,92 @@
+import cProfile
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from PySide2.QtCore import QObject, QTimer
+
+from helpers import short_path
+from logger import logger
+
+
+class StallWatchdog(QObject):
+    """
+    Detect stalls of the event loop of the GUI thread.
+
+    A timer on the GUI thread updates heartbeat and a watcher thread
+    checks it. When heartbeat is older than threshold (ms),
+    stack of the GUI thread at that moment is logged.
+    Watchdog must be created on the GUI thread.
+    """
+
+    def __init__(self, threshold: int = 200, parent=None):
+        super().__init__(parent)
+        if threshold <= 0:
+            raise ValueError(f'Threshold must be greater than 0, got {threshold}')
+        self.threshold: float = threshold / 1000
+        self.gui_thread_id: int = threading.get_ident()
+        self.last_beat: float = time.monotonic()
+        # Heartbeat which the watcher has reported as stalled.
+        # Both threads compare values instead of sharing a flag,
+        # so a beat racing with the watcher can't be reported as a stall
+        self.stalled_beat: Optional[float] = None
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.beat)
+        self.stopped = threading.Event()
+        self.watcher = threading.Thread(target=self.watch, name='StallWatchdog', daemon=True)
+
+    def start(self) -> None:
+        self.timer.start(max(int(self.threshold * 1000 / 4), 1))
+        self.watcher.start()
+        logger.debug(f'Watching for event loop stalls over {self.threshold * 1000:.0f}ms')
+
+    def stop(self) -> None:
+        self.timer.stop()
+        self.stopped.set()
+
+    def beat(self) -> None:
+        """ Update heartbeat, log stall duration when the event loop is back """
+        now: float = time.monotonic()
+        if self.stalled_beat == self.last_beat:
+            logger.warning(f'Event loop was stalled for {(now - self.last_beat) * 1000:.0f}ms')
+        self.last_beat = now
+
+    def watch(self) -> None:
+        """ Log stack of the GUI thread once per stall """
+        while not self.stopped.wait(self.threshold / 4):
+            last_beat: float = self.last_beat
+            stalled_for: float = time.monotonic() - last_beat
+            if stalled_for < self.threshold or last_beat == self.stalled_beat:
+                continue
+
+            self.stalled_beat = last_beat
+            frame = sys._current_frames().get(self.gui_thread_id)
+            stack: str = ''.join(traceback.format_stack(frame)) if frame else 'not available\n'
+            logger.warning(
+                f'Event loop is stalled for {stalled_for * 1000:.0f}ms, GUI thread stack:\n{stack}')
+
+
+@contextmanager
+def profile_session(file: Path = None):
+    """
+    Profile code of the block with cProfile and save stats to file.
+    Do nothing if file is None.
+    Stats can be read with "python -m pstats file"
+    """
+    if file is None:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(str(file))
+        logger.debug(f'Profile has been saved to {short_path(file)}')
@@ -0,0 +1,208 @@
+import random
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import requests
+from PySide2.QtCore import QObject, Signal
+from PySide2.QtGui import QImageReader
+
+from config import SEARCH_URL, config, set_path_var
+from helpers import list_images, short_path
+from logger import logger
+
+# Number of images wallhaven returns per page
+PAGE_SIZE: int = 24
+
+
+class Source:
+    """
+    Base class of wallpaper sources.
+
+    search() returns list of items in wallhaven layout:
+    {'id', 'path', 'url', 'resolution', 'thumbs': {'large'}}
+    so that JSON_FILE can be parsed the same way
+    whatever source the items came from.
+    """
+
+    def __init__(self, name: str, timeout: float = 10):
+        self.name: str = name
+        self.timeout: float = timeout
+
+    def search(self, payload: Dict[str, str] = None) -> List[Dict]:
+        raise NotImplementedError
+
+
+class JsonSource(Source):
+    """
+    Source for JSON APIs.
+
+    Keys are dotted paths to values inside the response,
+    defaults match wallhaven API.
+    Pass "use_payload = True" to send search payload as query.
+    """
+    prefix_ids: bool = True
+
+    def __init__(self, name: str, url: str, timeout: float = 10, use_payload: bool = False,
+                 items: str = 'data', id_: str = 'id', image: str = 'path', thumb: str = 'thumbs.large',
+                 page: str = 'url', resolution: str = 'resolution'):
+        super().__init__(name, timeout)
+        self.url: str = url
+        self.use_payload: bool = use_payload
+        self.items: str = items
+        self.id_: str = id_
+        self.image: str = image
+        self.thumb: str = thumb
+        self.page: str = page
+        self.resolution: str = resolution
+
+    def search(self, payload: Dict[str, str] = None) -> List[Dict]:
+        params = payload if self.use_payload else None
+        r = requests.get(self.url, params=params, timeout=self.timeout)
+        logger.debug(f'{self.name} responded {r.status_code} from {r.url}')
+        r.raise_for_status()
+
+        result: List[Dict] = []
+        for item in get_key(r.json(), self.items):
+            id_: str = str(get_key(item, self.id_))
+            # Prefix ids to keep them unique across sources
+            if self.prefix_ids:
+                id_ = f'{self.name}-{id_}'
+            result.append({
+                'id': id_,
+                'path': get_key(item, self.image),
+                'url': get_key(item, self.page, ''),
+                'resolution': get_key(item, self.resolution, ''),
+                'thumbs': {'large': get_key(item, self.thumb)},
+                'source': self.name,
+            })
+        return result
+
+
+class WallhavenSource(JsonSource):
+    """ Source for wallhaven.cc search API """
+    # Keep ids as they are, so JSON_FILE stays compatible with older versions
+    prefix_ids: bool = False
+
+    def __init__(self, name: str, url: str = SEARCH_URL, timeout: float = 10):
+        super().__init__(name, url, timeout, use_payload=True)
+
+
+class LocalSource(Source):
+    """
+    Source for images in a local directory.
+    Pick random PAGE_SIZE images on every search.
+    """
+
+    def __init__(self, name: str, dir_: Path, timeout: float = 10):
+        super().__init__(name, timeout)
+        self.dir_: Path = dir_
+
+    def search(self, payload: Dict[str, str] = None) -> List[Dict]:
+        if not self.dir_.is_dir():
+            logger.warning(f"{short_path(self.dir_)} doesn't exist")
+            return []
+
+        images: List[Path] = list_images(self.dir_)
+        images = random.sample(images, min(PAGE_SIZE, len(images)))
+
+        result: List[Dict] = []
+        for image in images:
+            uri: str = image.absolute().as_uri()
+            size = QImageReader(str(image)).size()
+            result.append({
+                'id': f'{self.name}-{image.stem}',
+                'path': uri,
+                'url': uri,
+                'resolution': f'{size.width()}x{size.height()}',
+                'thumbs': {'large': uri},
+                'source': self.name,
+            })
+        return result
+
+
+class SourceThread(QObject):
+    """
+    Run source's search method in a daemon thread,
+    so quitting never waits for a source which doesn't respond.
+    Call start() to run it.
+
+    Emit "finished_source" signal with search id, source name and list of items
+    when the source responds. If the source fails the list is empty.
+    Requests timeout only frees the thread, the caller is expected
+    to enforce source.timeout as a deadline of the whole search.
+    """
+    finished_source = Signal(int, str, list)
+
+    def __init__(self, source: Source, search_id: int, payload: Dict[str, str] = None, parent=None):
+        super().__init__(parent)
+        self.source: Source = source
+        self.search_id: int = search_id
+        self.payload: Dict[str, str] = payload
+        self.thread = threading.Thread(target=self.run, name=f'Source {source.name}', daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def is_running(self) -> bool:
+        return self.thread.is_alive()
+
+    def run(self):
+        items: List[Dict] = []
+        try:
+            items = self.source.search(self.payload)
+            logger.debug(f'{self.source.name} returned {len(items)} items')
+        except requests.Timeout:
+            logger.warning(f'{self.source.name} timed out after {self.source.timeout}s')
+        except (requests.RequestException, OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f'{self.source.name} failed: {e}')
+        self.finished_source.emit(self.search_id, self.source.name, items)
+
+
+def get_key(data: Dict, path: str, default: Any = None) -> Any:
+    """ Return value of dotted key path from nested dictionaries """
+    for key in path.split('.'):
+        if not isinstance(data, dict) or key not in data:
+            if default is None:
+                raise KeyError(path)
+            return default
+        data = data[key]
+    return data
+
+
+def load_sources() -> List[Source]:
+    """
+    Create sources from "[Source name]" sections of settings.
+    Fall back to wallhaven if no source is enabled.
+    """
+    sources: List[Source] = []
+
+    for section in config.sections():
+        if not section.startswith('Source '):
+            continue
+        options = config[section]
+        if not options.getboolean('enabled', True):
+            continue
+
+        name: str = section[len('Source '):].strip()
+        type_: str = options.get('type', 'wallhaven')
+        timeout: float = options.getfloat('timeout', 10)
+
+        if type_ == 'wallhaven':
+            sources.append(WallhavenSource(name, options.get('url', SEARCH_URL), timeout))
+        elif type_ == 'json':
+            keys = {key: options[option] for key, option in
+                    (('items', 'items'), ('id_', 'id'), ('image', 'image'), ('thumb', 'thumb'),
+                     ('page', 'page'), ('resolution', 'resolution')) if option in options}
+            sources.append(JsonSource(name, options['url'], timeout,
+                                      use_payload=options.getboolean('use_payload', False), **keys))
+        elif type_ == 'local':
+            sources.append(LocalSource(name, set_path_var(str(Path(options['path']).expanduser())), timeout))
+        else:
+            logger.error(f'Unknown type {type_} of source {name}')
+
+    if not sources:
+        sources.append(WallhavenSource('wallhaven'))
+
+    logger.debug(f'Sources: {", ".join(source.name for source in sources)}')
+    return sources
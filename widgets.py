@@ -17,7 +17,7 @@ class ImageLabel(QLabel):
     def __init__(self, image: Path, parent=None):
         super().__init__(parent)
         self.image: Path = image
-        self.image_id: str = self.image.name[:-4]
+        self.image_id: str = self.image.stem
         self.pixmap = QPixmap(str(self.image))
         self.setPixmap(self.pixmap)
         self.setAlignment(Qt.AlignCenter)
@@ -108,6 +108,7 @@ class ProgressBar(QProgressBar):
         self.setStyleSheet(style)
         self.setTextVisible(False)
         self.setMaximumHeight(10)
+        self.maxrange: int = maxrange
         self.setRange(0, maxrange)
         self.setValue(0)
         self.setAlignment(Qt.AlignRight)
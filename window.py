@@ -0,0 +1,436 @@
+"""
+Main window of Changewall
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Set
+
+from PySide2.QtCore import QThreadPool, QTimer
+from PySide2.QtGui import QGuiApplication
+from PySide2.QtWidgets import (QApplication, QDialog, QHBoxLayout, QLabel,
+                               QVBoxLayout, QMessageBox)
+
+from widgets import (Button, ProgressBar,
+                     StackedWidget)
+from downloader import THUMB_FORMAT, Download, ThumbnailThread
+from helpers import (create_dirs, image_info, is_dir_contains_images,
+                     short_path, set_wall, get_screen_res, url_suffix)
+from logger import logger
+from sources import Source, SourceThread, load_sources
+from instance import InstanceServer
+from profiling import StallWatchdog, profile_session
+from config import JSON_FILE, THUMBS_DIR, CURRENT_DIR, SAVED_DIR, INFO_COLOR, config, config_save, \
+    win_size, win_pos, SINGLE_INSTANCE
+
+
+class Changewall(QDialog):
+    """ Parent of all the widgets """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.screen_width, self.screen_height = get_screen_res(screen)
+        self.screen_res: str = f'{self.screen_width}x{self.screen_height}'
+        self.payload: Dict[str, str] = {'sorting': 'random', 'categories': '100', 'atleast': self.screen_res}
+
+        self.sources: List[Source] = load_sources()
+        # Last search thread of each source, a source is skipped
+        # while its thread of a previous update is still running
+        self.source_threads: Dict[str, SourceThread] = {}
+        self.search_id: int = 0
+        self.pending_sources: Set[str] = set()
+        self.results: List[Dict] = []
+        self.thumb_ids: Set[str] = set()
+        self.thumbs_total: int = 0
+        self.thumbs_done: int = 0
+        self.queued_commands: List[str] = []
+
+        self.sw = StackedWidget()
+
+        self.progressbar = ProgressBar()
+        self.progressbar.hide()
+
+        self.prev_btn = Button('angle-left.svg', key='left')
+        self.next_btn = Button('angle-right.svg', key='right')
+        self.update_btn = Button('sync-alt.svg', ' Update', key='r')
+        self.apply_btn = Button('check.svg', 'Apply')
+        self.save_btn = Button('save.svg', 'Save')
+
+        self.prev_btn.clicked.connect(self.prev)
+        self.next_btn.clicked.connect(self.next)
+        self.apply_btn.clicked.connect(self.apply)
+        self.update_btn.clicked.connect(self.update_)
+        self.save_btn.clicked.connect(self.save)
+
+        self.saved_msg = QLabel('Saved')
+        self.image_count = QLabel()
+        self.image_res = QLabel()
+        self.saved_msg.setStyleSheet(f'color: {INFO_COLOR}')
+        self.image_count.setStyleSheet(f'color: {INFO_COLOR}')
+        self.image_res.setStyleSheet(f'color: {INFO_COLOR}')
+
+        self.info_layout = QHBoxLayout()
+        self.info_layout.addWidget(self.progressbar)
+        self.info_layout.addStretch()
+        self.info_layout.addWidget(self.image_count)
+        self.info_layout.addWidget(self.image_res)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.prev_btn)
+        button_layout.addWidget(self.next_btn)
+        button_layout.addWidget(self.update_btn)
+        button_layout.addWidget(self.apply_btn)
+        button_layout.addWidget(self.save_btn)
+
+        self.main_layout = QVBoxLayout()
+        self.main_layout.addLayout(self.info_layout)
+        self.main_layout.addWidget(self.sw)
+        self.main_layout.addLayout(button_layout)
+        self.setLayout(self.main_layout)
+
+        self.sw.added.connect(self.change_image_count)
+
+    def prev(self) -> None:
+        """ Show previous image in stacked widget """
+        current_index: int = self.sw.currentIndex()
+        if current_index > 0:
+            self.sw.setCurrentIndex(current_index - 1)
+        logger.debug(
+            f"Stacked widget's current index is {self.sw.currentIndex()}")
+        self.change_info()
+
+    def next(self) -> None:
+        """ Show next image in stacked widget """
+        current_index: int = self.sw.currentIndex()
+        self.sw.setCurrentIndex(current_index + 1)
+        logger.debug(
+            f"Stacked widget's current index is {self.sw.currentIndex()}")
+        self.change_info()
+
+    def update_(self) -> None:
+        """
+        Query all sources concurrently, delete old thumbnails
+        and clear stacked widget.
+
+        Results of each source are merged as soon as it responds.
+        Sources which don't respond in source.timeout seconds are skipped
+        """
+        for file in THUMBS_DIR.iterdir():
+            logger.debug(f'Deleting {short_path(file)}')
+            file.unlink()
+
+        # Clear stacked widget
+        for _ in range(self.sw.count()):
+            widget = self.sw.widget(0)
+            self.sw.removeWidget(widget)
+            del widget
+
+        self.search_id += 1
+        self.pending_sources = {source.name for source in self.sources}
+        self.results = []
+        self.thumb_ids = set()
+        self.thumbs_total = 0
+        self.thumbs_done = 0
+
+        # Show busy indicator until the first source responds
+        self.progressbar.setRange(0, 0)
+        self.progressbar.show()
+
+        for source in self.sources:
+            # Don't stack up threads of a source which doesn't respond
+            previous: SourceThread = self.source_threads.get(source.name)
+            if previous is not None and previous.is_running():
+                logger.warning(f'{source.name} is still busy with previous update, skipping it')
+                self.pending_sources.discard(source.name)
+                continue
+
+            st = SourceThread(source, self.search_id, self.payload)
+            st.finished_source.connect(self.merge_results)
+            self.source_threads[source.name] = st
+            st.start()
+            QTimer.singleShot(int(source.timeout * 1000),
+                              lambda search_id=self.search_id, name=source.name: self.source_timeout(search_id, name))
+
+        self.check_thumbs_finished()
+
+    def merge_results(self, search_id: int, name: str, items: List[Dict]) -> None:
+        """
+        Append items of a source to JSON_FILE
+        and start downloading their thumbnails
+        """
+        if search_id != self.search_id or name not in self.pending_sources:
+            logger.debug(f'Dropping {len(items)} late items of {name}')
+            return
+
+        self.pending_sources.discard(name)
+        self.results.extend(items)
+        with open(JSON_FILE, 'w') as f:
+            json.dump({'data': self.results}, f, indent=4)
+
+        self.thumbs_total += len(items)
+        if self.thumbs_total:
+            self.progressbar.setRange(0, self.thumbs_total)
+            self.progressbar.setValue(self.thumbs_done)
+
+        self.download_thumbs(items)
+
+    def source_timeout(self, search_id: int, name: str) -> None:
+        """ Stop waiting for a source which hasn't responded in time """
+        if search_id == self.search_id and name in self.pending_sources:
+            logger.warning(f"{name} hasn't responded in time")
+            self.pending_sources.discard(name)
+            self.check_thumbs_finished()
+
+    def apply(self) -> None:
+        """ Set current image as wallpaper """
+        for file in CURRENT_DIR.iterdir():
+            file.unlink()
+            logger.debug(f'Deleted {short_path(file)}')
+
+        image_id: str = self.sw.current_image_id()
+        info: Dict[str, str] = image_info(image_id)
+        image: Path = Path(info['image_id'] + info['extension'])
+
+        self.progressbar.show()
+        download = Download(image, CURRENT_DIR, info['full_image_url'], stream=True)
+        download.finished_chunk.connect(self.set_progressbar)
+        download.finished_file.connect(set_wall)
+        download.save()
+
+    def save(self) -> None:
+        """
+        Save image to CURRENT_DIR
+        When image is saved, show Saved label
+        """
+        image_id: str = self.sw.current_image_id()
+        info: Dict[str, str] = image_info(image_id)
+        image: Path = Path(info['image_id'] + info['extension'])
+
+        self.progressbar.show()
+        download = Download(image, SAVED_DIR, info['full_image_url'], stream=True)
+        download.finished_chunk.connect(self.set_progressbar)
+        download.save()
+
+        # Show message "Saved" for 3 seconds in info layout
+        self.info_layout.insertWidget(2, self.saved_msg)
+        self.saved_msg.show()
+        QTimer.singleShot(3000, self.hide_msg)
+
+        save_msg: bool = config.getboolean('Program', 'show_save_message')
+
+        def disable_save_msg():
+            config['Program']['show_save_message'] = 'no'
+            config_save()
+            logger.debug('Save message is now disabled')
+
+        # Create and show "save message box" if it is set to True
+        if save_msg:
+            msgBox = QMessageBox(self)
+            msgBox.setIcon(QMessageBox.Information)
+            msgBox.setText('Saved')
+            msgBox.setInformativeText(f'The image has been saved to \n{str(SAVED_DIR)}')
+            msgBox.setStandardButtons(QMessageBox.Ok)
+            dontshow_btn = msgBox.addButton("Don't show again", QMessageBox.ActionRole)
+            dontshow_btn.clicked.connect(disable_save_msg)
+            msgBox.exec_()
+
+    def hide_msg(self) -> None:
+        """ Remove save label from info layout and hide it """
+        self.info_layout.removeWidget(self.saved_msg)
+        self.saved_msg.hide()
+
+    def download_thumbs(self, items: List[Dict] = None) -> None:
+        """
+        Download thumbnails of items asynchronously.
+        Parse JSON_FILE if items are not passed.
+
+        Each time thumbnail is downloaded, it is added to
+        stacked widget and progressbar is updated
+        """
+        if items is None:
+            with open(JSON_FILE, 'r') as f:
+                items = json.load(f)['data']
+            self.thumbs_total = len(items)
+            self.thumbs_done = 0
+            self.progressbar.setRange(0, self.thumbs_total)
+
+        for item in items:
+            url: str = item['thumbs']['large']
+            # Local images are scaled and saved in a format Qt can write
+            suffix: str = THUMB_FORMAT if url.startswith('file://') else url_suffix(url)
+            name: Path = Path(item['id'] + suffix)
+            self.thumb_ids.add(item['id'])
+            tt = ThumbnailThread(name, THUMBS_DIR, url, self.search_id)
+            tt.finished_thumb.connect(self.thumb_finished)
+            QThreadPool.globalInstance().start(tt)
+
+        self.check_thumbs_finished()
+
+    def thumb_finished(self, search_id: int, file: Path, saved: bool) -> None:
+        """
+        Add thumbnail to stacked widget and update progressbar.
+        Drop thumbnails of previous updates
+        """
+        if search_id != self.search_id:
+            logger.debug(f'Dropping {short_path(file)} of previous update')
+            # Keep the file if current update has requested the same thumbnail
+            if saved and file.stem not in self.thumb_ids:
+                file.unlink(missing_ok=True)
+            return
+
+        if saved:
+            self.sw.add(file)
+            while self.queued_commands:
+                self.run_command(self.queued_commands.pop(0))
+        self.thumbs_done += 1
+        self.progressbar.setValue(self.thumbs_done)
+        self.check_thumbs_finished()
+
+    def check_thumbs_finished(self) -> None:
+        """
+        Hide progressbar and restore its range
+        when all sources responded and all thumbnails are downloaded
+        """
+        if not self.pending_sources and self.thumbs_done >= self.thumbs_total:
+            if self.queued_commands:
+                logger.warning(f'No images to {", ".join(self.queued_commands)}')
+                self.queued_commands.clear()
+            self.progressbar.hide()
+            self.progressbar.setRange(0, self.progressbar.maxrange)
+            self.progressbar.setValue(0)
+
+    def change_image_count(self) -> None:
+        """
+        Update info of current image position in stacked widget
+        and total number of images
+        """
+        self.image_count.setText(self.sw.count_info())
+
+    def change_info(self) -> None:
+        """
+        Everytime change_info is called
+        it get info of current image to
+        update label 'image_res' with
+        image resolution and image
+        position in stacked widget
+        """
+        info: Dict[str, str] = image_info(self.sw.current_image_id())
+        self.change_image_count()
+        if len(info) > 0:
+            self.image_res.setText(info['resolution'])
+        else:
+            self.image_res.setText('Image info not found')
+
+    def set_progressbar(self, _) -> None:
+        """
+        Update progressbar and hide it
+        when it reaches its maximum
+        """
+        current: int = self.progressbar.value()
+        self.progressbar.setValue(current + 1)
+        if current == self.progressbar.maximum():
+            self.progressbar.hide()
+            self.progressbar.setValue(0)
+
+    def load(self) -> None:
+        """
+        Download thumbnails if THUMBS_DIR is empty
+        or JSON_FILE don't exist.
+        Otherwise fill stacked widget with existing thumbnails
+        """
+        create_dirs(THUMBS_DIR, CURRENT_DIR, SAVED_DIR)
+
+        if JSON_FILE.exists():
+            if not is_dir_contains_images(THUMBS_DIR):
+                logger.debug(f"{short_path(THUMBS_DIR)} is empty. Downloading new thumbnails")
+                self.progressbar.show()
+                self.download_thumbs()
+            else:
+                logger.debug('Filling stacked widget')
+                self.sw.fill()
+                self.change_info()
+        else:
+            logger.debug(f"{short_path(JSON_FILE)} doesn't exist. Updating")
+            self.update_()
+
+    def run_command(self, command: str) -> None:
+        """
+        Run command received from another invocation.
+        Commands which need an image are queued
+        until the first thumbnail of a running update is added
+        """
+        if command in ('next', 'apply', 'save') and self.sw.count() == 0:
+            if self.pending_sources or self.thumbs_done < self.thumbs_total:
+                logger.debug(f'Queued {command} until the first thumbnail is added')
+                self.queued_commands.append(command)
+            else:
+                logger.warning(f'No images to {command}')
+            return
+
+        actions = {'next': self.next, 'apply': self.apply, 'save': self.save,
+                   'refresh': self.update_, 'show': self.raise_window}
+        actions[command]()
+
+    def raise_window(self) -> None:
+        """ Show the window on top of other windows """
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def resize_move(self) -> None:
+        """ Resize and move window using parameters from settings """
+        try:
+            self.resize(*win_size)
+            logger.debug(f'Resized window to {win_size}')
+        except:
+            logger.warning('Could not resize window')
+
+        if win_pos:
+            try:
+                self.move(*win_pos)
+                logger.debug(f'Moved window to {win_pos}')
+            except:
+                logger.warning('Could not move window to a new position')
+
+    def closeEvent(self, event) -> None:
+        """ Save window size and position before closing the window"""
+        config['Program']['window_size'] = f'{self.width()}, {self.height()}'
+        config['Program']['window_position'] = f'{self.x()}, {self.y()}'
+        config_save()
+
+
+def run_spp(command: str = None, stall_threshold: int = None, profile: Path = None):
+    with profile_session(profile):
+        app = QApplication([])
+        global screen
+        screen = QGuiApplication.screens()[0]
+
+        if stall_threshold is not None:
+            watchdog = StallWatchdog(stall_threshold)
+            app.aboutToQuit.connect(watchdog.stop)
+            watchdog.start()
+
+        # Listen before creating the window. start() checks for a running
+        # instance under a lock file, so of instances started at the same time
+        # only the first listens and the others send it "show" and exit.
+        # Debug sessions run anyway to be measured
+        server = InstanceServer()
+        if SINGLE_INSTANCE and not server.start() and stall_threshold is None and profile is None:
+            sys.exit()
+
+        main = Changewall()
+        main.resize_move()
+        main.setWindowTitle('Changewall')
+        main.show()
+        server.command.connect(main.run_command)
+
+        search_id: int = main.search_id
+        main.load()
+        if command == 'refresh' and main.search_id != search_id:
+            logger.debug('Skipping refresh, load has already started an update')
+        elif command:
+            main.run_command(command)
+        exit_code: int = app.exec_()
+    sys.exit(exit_code)
+